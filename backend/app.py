@@ -1,14 +1,16 @@
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
-from flask import Flask, request, jsonify
+import orjson
+from flask import Flask, Response, request, stream_with_context
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from marshmallow import Schema, fields, ValidationError
 from dotenv import load_dotenv
 
-from search import search_recipes
-from generate_response import generate_response
+import semantic_cache
+from search import encode_query, search_recipes, warm_up
+from generate_response import FALLBACK_MESSAGES, YOUTUBE_WATCH_URL, generate_response, stream_response
 
 # ---------------------------------------------------------------------
 # App setup
@@ -20,106 +22,230 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
+# Worker pool for the (network-bound) Gemini calls
+_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("GENERATION_WORKERS", "8")))
+_GENERATION_TIMEOUT = float(os.getenv("GENERATION_TIMEOUT", "25"))
+
 # Rate limiting (basic abuse protection)
+# Counters live in Redis (pooled connections) so limits are shared by all workers.
+# If Redis is unreachable, limits fall back to per-process memory instead of failing
+# requests; set LIMITER_STORAGE=memory:// to skip Redis entirely (single-process dev run).
+# fixed-window is a plain INCR + EXPIRE per hit (moving-window needs a Lua script + a list).
 limiter = Limiter(
     get_remote_address,
     app=app,
     default_limits=["200 per day", "50 per hour"],
+    storage_uri=os.getenv("LIMITER_STORAGE", "redis://127.0.0.1:6379"),
+    storage_options={"max_connections": int(os.getenv("LIMITER_MAX_CONNECTIONS", "20"))},
+    strategy=os.getenv("LIMITER_STRATEGY", "fixed-window"),
+    in_memory_fallback_enabled=True,
 )
 
 
 # ---------------------------------------------------------------------
 # Request validation
 # ---------------------------------------------------------------------
-class SearchSchema(Schema):
+# User-facing messages shared by both search endpoints
+NO_RESULTS_MESSAGE = "No relevant recipes found for your query."
+SEARCH_ERROR_MESSAGE = "Erreur interne lors de la recherche des recettes."
+GENERATION_ERROR_MESSAGE = "Erreur lors de la génération de la réponse."
+
+# Upper bound on top_k: bounds the vector-search result buffers per request
+MAX_TOP_K = int(os.getenv("MAX_TOP_K", "50"))
+
+
+def validate_search(payload):
     """
-    Validate incoming search request payload.
+    Validate incoming search request payload (plain checks, no schema machinery).
 
     Expected JSON:
       - query: non-empty string
-      - top_k: positive integer (optional)
-    """
-    query = fields.Str(required=True, validate=lambda s: len(s.strip()) > 0)
-    top_k = fields.Int(load_default=5, validate=lambda n: n > 0)
+      - top_k: positive integer, at most MAX_TOP_K (optional, defaults to 5)
 
+    Returns:
+        (query, top_k) with the query stripped.
 
-search_schema = SearchSchema()
+    Raises:
+        ValueError: with a user-facing message if the payload is invalid.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("invalid payload")
+    query = payload.get("query")
+    if not isinstance(query, str) or not query.strip():
+        raise ValueError("invalid query")
+    top_k = payload.get("top_k", 5)
+    if not isinstance(top_k, int) or isinstance(top_k, bool) or not 0 < top_k <= MAX_TOP_K:
+        raise ValueError("invalid top_k")
+    return query.strip(), top_k
 
 
 # ---------------------------------------------------------------------
-# Routes
+# Helpers
 # ---------------------------------------------------------------------
-@app.route("/search", methods=["POST"])
-@limiter.limit("10 per minute")
-def search_endpoint():
+def ojsonify(obj) -> Response:
+    """jsonify() replacement serializing with orjson (C/Rust, much faster than stdlib json)."""
+    return app.response_class(orjson.dumps(obj), mimetype="application/json")
+
+
+def _load_payload():
+    """Parse the request body as JSON with orjson (invalid or empty body -> {})."""
+    try:
+        return orjson.loads(request.get_data() or b"{}") or {}
+    except orjson.JSONDecodeError:
+        return {}
+
+
+def _video_links(recipes):
+    """Build placeholder video links: recipe id -> YouTube URL."""
+    return {
+        recipe.get("id", f"recipe_{idx}"): f"{YOUTUBE_WATCH_URL}{recipe.get('id', '')}"
+        for idx, recipe in enumerate(recipes)
+    }
+
+
+def _sse(event: str, data) -> str:
+    """Format one Server-Sent Event (data is JSON-encoded so newlines are safe)."""
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+
+
+def _prepare_search():
     """
-    Main endpoint:
+    Steps shared by /search and /search/stream:
       - validates request JSON
+      - returns a cached answer for a (semantically) repeated query
       - retrieves similar recipes via vector search
-      - generates a final natural-language response
-      - returns recipes + placeholder video links
+
+    Returns:
+        (error, ctx): `error` is a (response, status) tuple to return as-is, or None.
+        `ctx` holds query, top_k, query_embedding, recipes, videos and `response`:
+        the final answer text when no generation is needed (cache hit, no recipes), else None.
     """
     # 1) Validate user input
     try:
-        payload = request.get_json(silent=True) or {}
-        data = search_schema.load(payload)
-    except ValidationError as err:
-        return jsonify(err.messages), 400
-
-    user_query = data["query"].strip()
-    top_k = data["top_k"]  # default handled by schema
+        user_query, top_k = validate_search(_load_payload())
+    except ValueError as err:
+        return (ojsonify({"error": str(err)}), 400), None
 
-    # 2) Search recipes
+    # 2) Search recipes (the query embedding is memoized, so search_recipes reuses it)
     try:
-        recipes, recipe_embeddings, query_embedding = search_recipes(user_query, top_k=top_k)
+        query_embedding = encode_query(user_query)
+        cached = semantic_cache.lookup(query_embedding, top_k)
+        if cached is None:
+            recipes, query_embedding = search_recipes(user_query, top_k=top_k)
     except Exception as e:
         logger.exception("Recipe search failed: %s", e)
-        return jsonify({"error": "Erreur interne lors de la recherche des recettes."}), 500
-
-    if not recipes:
-        return jsonify(
-            {
-                "query": user_query,
-                "response": "No relevant recipes found for your query.",
-                "recipes": [],
-                "videos": {},
-            }
-        ), 200
-
-    # 3) Generate AI response
-    try:
-        response_text = generate_response(user_query, recipes, recipe_embeddings, query_embedding)
-    except Exception as e:
-        logger.exception("Response generation failed: %s", e)
-        response_text = "Erreur lors de la génération de la réponse."
+        return (ojsonify({"error": SEARCH_ERROR_MESSAGE}), 500), None
 
-    # 4) Build placeholder video links (kept as in your current behavior)
-    recipe_videos = {
-        recipe.get("id", f"recipe_{idx}"): f"https://www.youtube.com/watch?v={recipe.get('id', '')}"
-        for idx, recipe in enumerate(recipes)
-    }
+    ctx = {"query": user_query, "top_k": top_k, "query_embedding": query_embedding}
+    if cached is not None:
+        ctx["response"], ctx["recipes"], ctx["videos"] = cached
+    elif not recipes:
+        ctx.update(response=NO_RESULTS_MESSAGE, recipes=[], videos={})
+    else:
+        # Placeholder video links (kept as in your current behavior)
+        ctx.update(response=None, recipes=recipes, videos=_video_links(recipes))
+    return None, ctx
+
+
+def _cache_answer(ctx, response_text: str) -> None:
+    """Cache a generated answer for this search; error fallbacks are never cached."""
+    if response_text in FALLBACK_MESSAGES or response_text == GENERATION_ERROR_MESSAGE:
+        return
+    semantic_cache.store(ctx["query_embedding"], ctx["top_k"], (response_text, ctx["recipes"], ctx["videos"]))
+
+
+# ---------------------------------------------------------------------
+# Routes
+# ---------------------------------------------------------------------
+@app.route("/search", methods=["POST"])
+@limiter.limit("10 per minute")
+def search_endpoint():
+    """
+    Main endpoint:
+      - validates, reuses a cached answer, or searches recipes (see _prepare_search)
+      - generates a final natural-language response
+      - returns recipes + placeholder video links
+    """
+    error, ctx = _prepare_search()
+    if error is not None:
+        return error
 
-    return jsonify(
+    response_text = ctx["response"]
+    if response_text is None:
+        # 3) Generate AI response on the worker pool
+        gen_future = _POOL.submit(generate_response, ctx["query"], ctx["recipes"])
+        try:
+            response_text = gen_future.result(timeout=_GENERATION_TIMEOUT)
+        except Exception as e:
+            # Drop the generation if it is still queued: the client already gets the error text
+            gen_future.cancel()
+            logger.exception("Response generation failed: %s", e)
+            response_text = GENERATION_ERROR_MESSAGE
+        _cache_answer(ctx, response_text)
+
+    return ojsonify(
         {
-            "query": user_query,
+            "query": ctx["query"],
             "response": response_text,
-            "recipes": recipes,
-            "videos": recipe_videos,
+            "recipes": ctx["recipes"],
+            "videos": ctx["videos"],
         }
     ), 200
 
 
+@app.route("/search/stream", methods=["POST"])
+@limiter.limit("10 per minute")
+def search_stream_endpoint():
+    """
+    Streaming variant of /search (text/event-stream).
+
+    Same input as /search. Emits, in order:
+      - "recipes": {"query", "recipes", "videos"} as soon as the vector search is done
+      - "chunk": a piece of the generated answer (repeated)
+      - "error": a user-friendly message if generation fails mid-stream
+      - "done": end of stream
+    """
+    error, ctx = _prepare_search()
+    if error is not None:
+        return error
+
+    def events():
+        yield _sse("recipes", {"query": ctx["query"], "recipes": ctx["recipes"], "videos": ctx["videos"]})
+
+        if ctx["response"] is not None:
+            yield _sse("chunk", ctx["response"])
+            yield _sse("done", {})
+            return
+
+        # 3) Stream the AI response
+        parts = []
+        try:
+            for text in stream_response(ctx["query"], ctx["recipes"]):
+                parts.append(text)
+                yield _sse("chunk", text)
+        except Exception as e:
+            logger.exception("Response generation failed: %s", e)
+            yield _sse("error", GENERATION_ERROR_MESSAGE)
+            yield _sse("done", {})
+            return
+
+        _cache_answer(ctx, "".join(parts).strip())
+        yield _sse("done", {})
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream")
+
+
 # ---------------------------------------------------------------------
 # Error handlers
 # ---------------------------------------------------------------------
 @app.errorhandler(400)
 def bad_request(_error):
-    return jsonify({"error": "Bad Request"}), 400
+    return ojsonify({"error": "Bad Request"}), 400
 
 
 @app.errorhandler(500)
 def internal_error(_error):
-    return jsonify({"error": "Internal Server Error"}), 500
+    return ojsonify({"error": "Internal Server Error"}), 500
 
 
 # ---------------------------------------------------------------------
@@ -127,4 +253,5 @@ def internal_error(_error):
 # ---------------------------------------------------------------------
 if __name__ == "__main__":
     port = int(os.getenv("PORT", "5000"))
+    warm_up()
     app.run(host="0.0.0.0", port=port, debug=False)
@@ -0,0 +1,176 @@
+import os
+import shutil
+import logging
+import tempfile
+import importlib.util
+from typing import List, Union
+
+import numpy as np
+
+# ---------------------------------------------------------------------
+# Logging
+# ---------------------------------------------------------------------
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+# "onnx" (int8-quantized ONNX Runtime model) or "torch" (plain SentenceTransformer)
+_BACKEND = os.getenv("EMBEDDING_BACKEND", "onnx").lower()
+_ONNX_DIR = os.getenv("ONNX_MODEL_DIR", "./onnx_minilm")
+_ONNX_FILE = "model_quantized.onnx"
+_MAX_SEQ_LENGTH = 256  # same as the SentenceTransformer config of all-MiniLM-L6-v2
+
+
+class OnnxEncoder:
+    """
+    Drop-in replacement for SentenceTransformer.encode backed by an int8 ONNX model.
+
+    Runs the quantized transformer through ONNX Runtime, then applies the same
+    mean pooling (and optional L2 normalization) as the original model.
+    """
+
+    def __init__(self, model, tokenizer):
+        self._model = model
+        self._tokenizer = tokenizer
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        show_progress_bar: bool = False,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False,
+    ) -> np.ndarray:
+        """Encode sentences into a (n, dim) float32 array (a 1-D vector for a single string)."""
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        chunks: List[np.ndarray] = []
+        for start in range(0, len(sentences), batch_size):
+            inputs = self._tokenizer(
+                sentences[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=_MAX_SEQ_LENGTH,
+                return_tensors="np",
+            )
+            token_embeddings = np.asarray(self._model(**inputs).last_hidden_state, dtype=np.float32)
+
+            # Mean pooling over real (non-padding) tokens
+            mask = inputs["attention_mask"][..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+            if normalize_embeddings:
+                pooled /= np.linalg.norm(pooled, axis=1, keepdims=True) + 1e-12
+            chunks.append(pooled)
+
+        embeddings = np.concatenate(chunks) if chunks else np.empty((0, 0), dtype=np.float32)
+        return embeddings[0] if single else embeddings
+
+
+def _export_onnx() -> None:
+    """
+    Export the model to ONNX + dynamic int8 quantization into _ONNX_DIR.
+
+    Everything is written to a temporary directory next to _ONNX_DIR, which is only
+    moved into place once quantization has finished: an interrupted export never
+    leaves a partial model that later starts would take as valid.
+    """
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    logger.info("Exporting %s to ONNX + int8 in %s (one-off)...", MODEL_NAME, _ONNX_DIR)
+    parent = os.path.dirname(os.path.abspath(_ONNX_DIR))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".onnx_export_", dir=parent)
+    try:
+        fp32_model = ORTModelForFeatureExtraction.from_pretrained(MODEL_NAME, export=True)
+        fp32_model.save_pretrained(tmp_dir)
+        AutoTokenizer.from_pretrained(MODEL_NAME).save_pretrained(tmp_dir)
+
+        quantizer = ORTQuantizer.from_pretrained(fp32_model)
+        qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=tmp_dir, quantization_config=qconfig)
+
+        try:
+            os.replace(tmp_dir, _ONNX_DIR)
+        except OSError:
+            # Another export finished first: keep it if it is complete
+            if not onnx_model_ready():
+                raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def onnx_model_ready() -> bool:
+    """
+    Whether load_embedding_model(allow_export=False) can succeed without exporting.
+
+    True when the ONNX backend is not used (EMBEDDING_BACKEND=torch or optimum is
+    not installed) or when the quantized model is already in _ONNX_DIR.
+    """
+    if _BACKEND != "onnx" or importlib.util.find_spec("optimum") is None:
+        return True
+    return os.path.exists(os.path.join(_ONNX_DIR, _ONNX_FILE))
+
+
+def _load_onnx(allow_export: bool) -> OnnxEncoder:
+    """Load the quantized ONNX model, exporting and quantizing it first if allowed."""
+    from optimum.onnxruntime import ORTModelForFeatureExtraction
+    from transformers import AutoTokenizer
+
+    if not os.path.exists(os.path.join(_ONNX_DIR, _ONNX_FILE)):
+        if not allow_export:
+            raise RuntimeError(
+                f"Quantized ONNX model not found in {_ONNX_DIR}: "
+                "run `python embeddings.py` (or preprocess.py) once before starting the server."
+            )
+        _export_onnx()
+
+    model = ORTModelForFeatureExtraction.from_pretrained(_ONNX_DIR, file_name=_ONNX_FILE)
+    tokenizer = AutoTokenizer.from_pretrained(_ONNX_DIR)
+    return OnnxEncoder(model, tokenizer)
+
+
+def load_embedding_model(allow_export: bool = True):
+    """
+    Load the embedding model used for recipes and queries.
+
+    Uses the int8 ONNX model when EMBEDDING_BACKEND=onnx (default) and optimum is
+    installed, otherwise falls back to SentenceTransformer. Both expose the same
+    `encode(...)` contract. The model is warmed up so the first request does not
+    pay for lazy initialization.
+
+    Args:
+        allow_export: export + quantize the ONNX model if it is missing. Servers pass
+            False: the slow export must run once, out of band (see __main__ below).
+
+    Raises:
+        RuntimeError: if the ONNX model is missing and allow_export is False.
+    """
+    model = None
+    if _BACKEND == "onnx":
+        try:
+            model = _load_onnx(allow_export)
+        except ImportError:
+            logger.warning("optimum[onnxruntime] not installed; falling back to SentenceTransformer.")
+
+    if model is None:
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(MODEL_NAME)
+
+    model.encode(["warm up"], normalize_embeddings=True)
+    return model
+
+
+if __name__ == "__main__":
+    # One-off export step: python embeddings.py
+    load_embedding_model(allow_export=True)
+    logger.info("Embedding model ready.")
@@ -1,10 +1,9 @@
 import os
 import logging
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import google.generativeai as genai
 from dotenv import load_dotenv
-from sklearn.metrics.pairwise import cosine_similarity
 
 # ---------------------------------------------------------------------
 # Environment & logging
@@ -21,99 +20,159 @@ genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 _GEMINI_MODEL_NAME = "models/gemini-1.5-flash"
 _GEN_CONFIG = {"temperature": 0.7, "max_output_tokens": 300}
 
+# Built once and shared by all requests (the client's grpc channel is thread-safe)
+_GEMINI_MODEL = genai.GenerativeModel(model_name=_GEMINI_MODEL_NAME, generation_config=_GEN_CONFIG)
+
+# Number of recipes kept in the prompt
+_TOP_N = 3
+
+# Fixed instructions closing every prompt
+_PROMPT_SUFFIX = (
+    "Please provide a helpful response considering the following user preferences:\n"
+    "1. Main preferences: dietary restrictions, cuisine type, or cooking style.\n"
+    "2. Ease of preparation: simple to prepare, minimal ingredients.\n"
+    "3. Flavor and enjoyment: balanced and enjoyable dishes.\n"
+    "4. Additional criteria: health focus, specific cuisines.\n"
+    "Additionally, compare the recipes and explain why other options may be less suitable.\n"
+    "Suggest a complementary dish or side if applicable.\n\n"
+    "Please limit your response to approximately 200 words."
+)
+
+# Placeholder video links are built as YOUTUBE_WATCH_URL + recipe_id
+YOUTUBE_WATCH_URL = "https://www.youtube.com/watch?v="
+
+# User-facing fallback messages (returned instead of a generated answer)
+NO_RECIPES_MESSAGE = "Aucune recette pertinente trouvée."
+NO_ANSWER_MESSAGE = "Aucune réponse reçue du modèle."
+ERROR_MESSAGE = "Une erreur inattendue est survenue lors de la génération de la réponse."
+FALLBACK_MESSAGES = frozenset({NO_RECIPES_MESSAGE, NO_ANSWER_MESSAGE, ERROR_MESSAGE})
+
+
+def _build_prompt(query: str, recipes: List[Dict[str, Any]]) -> Tuple[str, Dict[str, str]]:
+    """
+    Build the Gemini prompt from the best recipes.
+
+    Returns:
+        A tuple (input_text, recipe_links) where recipe_links maps recipe_id -> video link.
+    """
+    entries: List[str] = []
+    recipe_links: Dict[str, str] = {}  # Store recipe_id -> video link (placeholder)
+
+    for recipe in recipes[:_TOP_N]:
+        get = recipe.get  # bound once per recipe
+        recipe_id = get("id", "unknown_id")
+        title = (get("title", "") or "").strip() or "Unnamed Recipe"
+        ingredients = get("ingredients", "")
+        directions = (get("directions", "") or "").strip()
+
+        # Keep the same truncation behavior
+        short_directions = directions[:200] if len(directions) > 200 else directions
+
+        # Placeholder YouTube link, same behavior as your code
+        youtube_link = f"{YOUTUBE_WATCH_URL}{recipe_id}"
+        recipe_links[recipe_id] = youtube_link
+
+        entries.append(
+            f"- {title} (Video: {youtube_link})\n"
+            f"  Ingredients: {ingredients}\n"
+            f"  Steps: {short_directions}...\n\n"
+        )
+
+    body = "".join(entries)
+    input_text = f"User query: {query}\n\nHere are some recipes to consider:\n{body}{_PROMPT_SUFFIX}"
+    return input_text, recipe_links
+
+
+def _video_links_block(recipe_links: Dict[str, str]) -> str:
+    """Build the "Video Links" section appended at the end of the generated text."""
+    return "\n\nVideo Links:\n" + "\n".join([f"{rid}: {link}" for rid, link in recipe_links.items()])
+
+
+def _candidate_text(response) -> Optional[str]:
+    """Return the text of the first candidate of a Gemini response (or chunk), if any."""
+    if response and getattr(response, "candidates", None):
+        candidate = response.candidates[0]
+        return "".join(part.text for part in candidate.content.parts)
+    return None
+
 
 def generate_response(
     query: str,
     recipes: List[Dict[str, Any]],
-    recipe_embeddings: List[List[float]],
-    query_embedding: List[float],
 ) -> str:
     """
     Generate a natural-language answer using the user query and the top recipes.
 
     The function:
-      - computes cosine similarity between query_embedding and each recipe embedding
-      - keeps the best recipes (top 3)
+      - keeps the best recipes (top 3; `recipes` is already ranked by the vector search)
       - builds a prompt for Gemini
       - appends a "Video Links" section at the end of the generated text
 
     Args:
         query: User query text.
-        recipes: Recipe metadata list (each item is a dict).
-        recipe_embeddings: Embeddings for the retrieved recipes (same order as recipes).
-        query_embedding: Embedding vector for the query.
+        recipes: Recipe metadata list (each item is a dict), best match first.
 
     Returns:
         Generated answer (string). If no results or API issue, returns a user-friendly message.
     """
-    if not recipes or not recipe_embeddings:
-        return "Aucune recette pertinente trouvée."
+    if not recipes:
+        return NO_RECIPES_MESSAGE
 
-    # -----------------------------------------------------------------
-    # 1) Rank recipes by cosine similarity
-    # -----------------------------------------------------------------
-    similarity_scores = cosine_similarity([query_embedding], recipe_embeddings)[0]
-    ranked = sorted(zip(recipes, similarity_scores), key=lambda x: x[1], reverse=True)
+    input_text, recipe_links = _build_prompt(query, recipes)
 
     # -----------------------------------------------------------------
-    # 2) Build prompt
+    # Call Gemini
     # -----------------------------------------------------------------
-    prompt_lines: List[str] = [f"User query: {query}", "", "Here are some recipes to consider:"]
-    recipe_links: Dict[str, str] = {}  # Store recipe_id -> video link (placeholder)
+    try:
+        response = _GEMINI_MODEL.generate_content(contents=[input_text])
 
-    for recipe, _score in ranked[:3]:
-        recipe_id = recipe.get("id", "unknown_id")
-        title = (recipe.get("title", "") or "").strip() or "Unnamed Recipe"
-        ingredients = recipe.get("ingredients", "")
-        directions = (recipe.get("directions", "") or "").strip()
+        generated_text = _candidate_text(response)
+        if generated_text is not None:
+            # Keep same behavior: append Video Links block at the end
+            generated_text += _video_links_block(recipe_links)
+            return generated_text.strip()
 
-        # Keep the same truncation behavior
-        short_directions = directions[:200] if len(directions) > 200 else directions
+        return NO_ANSWER_MESSAGE
 
-        # Placeholder YouTube link, same behavior as your code
-        youtube_link = f"https://www.youtube.com/watch?v={recipe_id}"
-        recipe_links[recipe_id] = youtube_link
+    except Exception as e:
+        logger.error("Erreur inattendue : %s", e)
+        return ERROR_MESSAGE
+
+
+def stream_response(
+    query: str,
+    recipes: List[Dict[str, Any]],
+) -> Iterator[str]:
+    """
+    Streaming variant of generate_response: yields the answer chunk by chunk as Gemini produces it.
 
-        prompt_lines.append(f"- {title} (Video: {youtube_link})")
-        prompt_lines.append(f"  Ingredients: {ingredients}")
-        prompt_lines.append(f"  Steps: {short_directions}...")
-        prompt_lines.append("")
+    The "Video Links" section is yielded last. When there is nothing to generate from,
+    or the model returns no text, a single fallback message is yielded instead.
 
-    prompt_lines.append(
-        "Please provide a helpful response considering the following user preferences:\n"
-        "1. Main preferences: dietary restrictions, cuisine type, or cooking style.\n"
-        "2. Ease of preparation: simple to prepare, minimal ingredients.\n"
-        "3. Flavor and enjoyment: balanced and enjoyable dishes.\n"
-        "4. Additional criteria: health focus, specific cuisines.\n"
-        "Additionally, compare the recipes and explain why other options may be less suitable.\n"
-        "Suggest a complementary dish or side if applicable.\n\n"
-        "Please limit your response to approximately 200 words."
-    )
+    Args:
+        Same as generate_response.
 
-    input_text = "\n".join(prompt_lines)
+    Yields:
+        Text chunks of the answer.
 
-    # -----------------------------------------------------------------
-    # 3) Call Gemini
-    # -----------------------------------------------------------------
-    try:
-        model = genai.GenerativeModel(model_name=_GEMINI_MODEL_NAME)
-        response = model.generate_content(
-            contents=[input_text],
-            generation_config=_GEN_CONFIG,
-        )
+    Raises:
+        Exception: any Gemini API error (the caller decides how to report it mid-stream).
+    """
+    if not recipes:
+        yield NO_RECIPES_MESSAGE
+        return
 
-        if response and getattr(response, "candidates", None):
-            candidate = response.candidates[0]
-            generated_text = "".join(part.text for part in candidate.content.parts)
+    input_text, recipe_links = _build_prompt(query, recipes)
 
-            # Keep same behavior: append Video Links block at the end
-            generated_text += "\n\nVideo Links:\n" + "\n".join(
-                [f"{rid}: {link}" for rid, link in recipe_links.items()]
-            )
-            return generated_text.strip()
+    got_text = False
+    for chunk in _GEMINI_MODEL.generate_content(contents=[input_text], stream=True):
+        text = _candidate_text(chunk)
+        if text:
+            got_text = True
+            yield text
 
-        return "Aucune réponse reçue du modèle."
+    if not got_text:
+        yield NO_ANSWER_MESSAGE
+        return
 
-    except Exception as e:
-        logger.error("Erreur inattendue : %s", e)
-        return "Une erreur inattendue est survenue lors de la génération de la réponse."
+    yield _video_links_block(recipe_links)
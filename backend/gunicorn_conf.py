@@ -0,0 +1,30 @@
+# Gunicorn settings, e.g.: gunicorn -c gunicorn_conf.py app:app
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+timeout = 60
+
+# Import the app (FAISS index, Gemini setup) once in the master: workers share
+# those read-only pages copy-on-write instead of each loading them.
+preload_app = True
+
+
+def on_starting(server):
+    # The ONNX export/quantization is a slow one-off step run out of band
+    # (python embeddings.py or preprocess.py). Workers only load it, so refuse to
+    # start instead of letting them race on the export under the worker timeout.
+    import embeddings
+
+    if not embeddings.onnx_model_ready():
+        raise RuntimeError("Embedding model not exported: run `python embeddings.py` first.")
+
+
+def post_fork(server, worker):
+    # The embedding model is deliberately not loaded in the master: onnxruntime and
+    # torch thread pools do not survive fork() and a worker's first inference could
+    # hang. Each worker loads (never exports) and warms its own session after the fork.
+    import search
+
+    search.warm_up()
@@ -1,7 +1,10 @@
 import os
-import re
+import csv
 import ast
+import json
+from typing import List
 from pymongo import MongoClient
+from pymongo.errors import BulkWriteError
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -13,26 +16,44 @@ col = db["recipes"]
 
 CSV_PATH = r"C:\Users\fidou\Downloads\smart_recipe_finder\sample_recipes.csv"
 
-# Matches your real line format (verified on your uploaded file)
-LINE_RE = re.compile(
-    r'^"?(?P<id>\d+),(?P<title>.*?),""(?P<ingredients>\[.*?\])"",""(?P<directions>\[.*?\])"",'
-    r'(?P<link>[^,]*),(?P<source>[^,]*),""(?P<ner>\[.*?\])"""?;+$'
-)
-
-def decode_list_text(s: str) -> str:
-    # CSV escaped quotes -> normal quotes
-    # """" -> "  (this is the key for your file)
-    s = s.strip()
-    s = s.replace('""""', '"')
-    s = s.replace('""', '"')
-    return s
+# Each line of the file is a whole CSV row wrapped as a single quoted field and
+# padded with ";" separators, so it is parsed in two passes:
+#   1) outer pass (delimiter ";") -> the row text
+#   2) inner pass (delimiter ",") -> id, title, ingredients, directions, link, source, NER
+N_COLUMNS = 7
+INSERT_BATCH_SIZE = 1000
+
+def iter_rows(f):
+    outer = csv.reader(f, delimiter=";", quotechar='"', doublequote=True)
+    next(outer, None)  # skip header
+    for parts in outer:
+        # ";" inside a field also split the outer row: glue it back, drop the padding
+        row_text = ";".join(parts).rstrip(";")
+        yield next(csv.reader([row_text], quotechar='"', doublequote=True), [])
 
 def to_list(s: str):
+    # Lists are stored as JSON arrays; fall back to Python literals just in case
+    try:
+        obj = json.loads(s)
+    except ValueError:
+        try:
+            obj = ast.literal_eval(s)
+        except Exception:
+            return None
+    return obj if isinstance(obj, list) else None
+
+def flush(buf: List[dict]) -> int:
+    # One round-trip for the whole buffer; unordered so one bad doc doesn't stop the rest
+    if not buf:
+        return 0
     try:
-        obj = ast.literal_eval(s)
-        return obj if isinstance(obj, list) else None
-    except Exception:
-        return None
+        col.insert_many(buf, ordered=False)
+        n = len(buf)
+    except BulkWriteError as e:
+        n = e.details.get("nInserted", 0)
+        print("⚠️ Erreurs d'insertion:", len(e.details.get("writeErrors", [])))
+    buf.clear()
+    return n
 
 def main():
     print("CSV PATH =", CSV_PATH)
@@ -48,24 +69,18 @@ def main():
     inserted = 0
     skipped = 0
 
-    with open(CSV_PATH, "r", encoding="utf-8", errors="ignore") as f:
-        header = f.readline()  # skip header
-
-        for line in f:
-            line = line.strip("\n").strip("\r")
-            m = LINE_RE.match(line)
-            if not m:
+    buf: List[dict] = []
+    with open(CSV_PATH, "r", encoding="utf-8", errors="ignore", newline="") as f:
+        for row in iter_rows(f):
+            if len(row) != N_COLUMNS:
                 skipped += 1
                 continue
 
-            recipe_id = m.group("id").strip()
-            title = (m.group("title") or "").strip() or "Unnamed Recipe"
+            recipe_id = row[0].strip()
+            title = (row[1] or "").strip() or "Unnamed Recipe"
 
-            ing_txt = decode_list_text(m.group("ingredients"))
-            dir_txt = decode_list_text(m.group("directions"))
-
-            ingredients = to_list(ing_txt)
-            directions = to_list(dir_txt)
+            ingredients = to_list(row[2])
+            directions = to_list(row[3])
 
             if not ingredients or not directions:
                 skipped += 1
@@ -83,12 +98,15 @@ def main():
                 "name": title,
                 "ingredients": ingredients,
                 "directions": directions,
-                "link": (m.group("link") or "").strip(),
-                "source": (m.group("source") or "").strip(),
+                "link": (row[4] or "").strip(),
+                "source": (row[5] or "").strip(),
             }
 
-            col.insert_one(doc)
-            inserted += 1
+            buf.append(doc)
+            if len(buf) >= INSERT_BATCH_SIZE:
+                inserted += flush(buf)
+
+    inserted += flush(buf)
 
     print("✅ Insérés:", inserted)
     print("⚠️ Ignorés:", skipped)
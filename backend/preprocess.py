@@ -1,12 +1,15 @@
 import os
 import re
+import json
 import logging
 from typing import List, Dict, Any
 
 import chromadb
+import numpy as np
 from dotenv import load_dotenv
 from pymongo import MongoClient
-from sentence_transformers import SentenceTransformer
+
+from embeddings import load_embedding_model
 
 # ---------------------------------------------------------------------
 # Environment & logging
@@ -28,16 +31,62 @@ recipes_collection = db["recipes"]
 # ---------------------------------------------------------------------
 # Embedding model + ChromaDB setup
 # ---------------------------------------------------------------------
-_EMBEDDING_MODEL = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+# Same model as search.py (int8 ONNX by default); the
+# SentenceTransformer fallback picks CUDA automatically when it is available
+_EMBEDDING_MODEL = load_embedding_model()
+_ENCODE_BATCH_SIZE = int(os.getenv("ENCODE_BATCH_SIZE", "64"))
 
 _CHROMA_PATH = os.getenv("CHROMA_DB_PATH", "./chroma_db")
 _chroma_client = chromadb.PersistentClient(path=_CHROMA_PATH)
-collection = _chroma_client.get_or_create_collection(name="recipes_embeddings")
+_COLLECTION_NAME = "recipes_embeddings"
+collection = _chroma_client.get_or_create_collection(name=_COLLECTION_NAME)
+
+
+def rebuild_collection() -> None:
+    """
+    Drop and recreate the Chroma collection before indexing.
+
+    `collection.add` skips ids that already exist, so re-indexing into the old
+    collection would keep any legacy (non-normalized) vectors. The `normalized`
+    marker is only set by main() once every batch has been written.
+
+    Running servers keep a handle to the deleted collection: restart them after
+    re-indexing (they also read the exported FAISS index only at start).
+    """
+    global collection
+    _chroma_client.delete_collection(name=_COLLECTION_NAME)
+    collection = _chroma_client.create_collection(name=_COLLECTION_NAME)
+    logger.warning("Collection '%s' rebuilt: restart the backend once indexing is done.", _COLLECTION_NAME)
+
+
+# In-memory search index exported for search.py (FAISS IndexFlatIP)
+_INDEX_DIR = os.getenv("FAISS_INDEX_DIR", "./faiss_index")
 
 
 # ---------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------
+_SPACE_RE = re.compile(r"\s+")
+
+
+class _SpecialCharsTable(dict):
+    r"""
+    str.translate table deleting every character `[^\w\s]` would match.
+
+    Filled lazily per code point (Unicode is too large to pre-build), so accented
+    letters and other Unicode word characters are kept exactly as with the regex.
+    """
+
+    def __missing__(self, code: int):
+        ch = chr(code)
+        value = code if (ch.isalnum() or ch == "_" or ch.isspace()) else None
+        self[code] = value
+        return value
+
+
+_SPECIAL_CHARS_TABLE = _SpecialCharsTable()
+
+
 def normalize_text(text_list: List[str]) -> List[str]:
     """
     Clean and normalize a list of strings:
@@ -54,30 +103,27 @@ def normalize_text(text_list: List[str]) -> List[str]:
     """
     normalized: List[str] = []
     for t in text_list:
-        t = (t or "").strip().lower()
-        t = re.sub(r"\s+", " ", t)        # collapse multiple spaces
-        t = re.sub(r"[^\w\s]", "", t)     # remove special characters
-        normalized.append(t)
+        t = _SPACE_RE.sub(" ", (t or "").strip().lower())  # collapse multiple spaces
+        normalized.append(t.translate(_SPECIAL_CHARS_TABLE))  # remove special characters
     return normalized
 
 
-def vectorize_text(title: str, ingredients: List[str], directions: List[str]):
+def _recipe_text(title: str, ingredients: List[str], directions: List[str]) -> str:
     """
-    Convert a recipe (title + ingredients + directions) into a single embedding vector.
+    Concatenate a recipe (title + ingredients + directions) into the text that gets embedded.
     """
-    text = f"{title} {' '.join(ingredients)} {' '.join(directions)}"
-    return _EMBEDDING_MODEL.encode([text])[0]
+    return f"{title} {' '.join(ingredients)} {' '.join(directions)}"
 
 
 def process_batch(batch: List[Dict[str, Any]]) -> None:
     """
     Process a list of MongoDB recipe documents:
       - normalize ingredients/directions
-      - build embeddings
+      - build embeddings (one batched encode call for the whole batch)
       - store everything in ChromaDB
     """
     ids: List[str] = []
-    embeddings = []
+    texts: List[str] = []
     metadatas: List[Dict[str, Any]] = []
 
     for recipe in batch:
@@ -97,9 +143,8 @@ def process_batch(batch: List[Dict[str, Any]]) -> None:
             ingredients_str = ", ".join(ingredients)
             directions_str = ". ".join(directions)
 
-            embedding = vectorize_text(title, ingredients, directions)
-
             ids.append(str(recipe["_id"]))
+            texts.append(_recipe_text(title, ingredients, directions))
             metadatas.append(
                 {
                     "title": title,
@@ -107,21 +152,58 @@ def process_batch(batch: List[Dict[str, Any]]) -> None:
                     "directions": directions_str,
                 }
             )
-            embeddings.append(embedding)
 
         except Exception as e:
             logger.warning("Erreur lors du traitement de la recette %s: %s", recipe.get("_id"), e)
 
     # Push to Chroma only if we have data
     if ids:
+        embeddings = _EMBEDDING_MODEL.encode(
+            texts,
+            batch_size=_ENCODE_BATCH_SIZE,
+            show_progress_bar=False,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        ).astype(np.float32, copy=False)
         collection.add(
-            documents=["" for _ in ids],  # kept identical (empty documents)
-            embeddings=embeddings,
+            embeddings=embeddings,  # float32 ndarray, passed through as-is
             ids=ids,
             metadatas=metadatas,
         )
 
 
+def export_index() -> None:
+    """
+    Export every embedding + metadata of the Chroma collection for the in-memory
+    search index: `embeddings.npy` (float32, unit-length rows) and `metadatas.jsonl`
+    (one metadata dict per line, same order).
+    """
+    data = collection.get(include=["embeddings", "metadatas"])
+    embeddings = np.asarray(data.get("embeddings"), dtype=np.float32)
+    metadatas = data.get("metadatas") or []
+
+    if not len(metadatas):
+        logger.warning("Nothing to export: collection is empty.")
+        return
+
+    # Idempotent for normalized collections, fixes legacy ones
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-12
+
+    # Write to temp names, then swap them in, so a crash never leaves a half-written file
+    os.makedirs(_INDEX_DIR, exist_ok=True)
+    emb_path = os.path.join(_INDEX_DIR, "embeddings.npy")
+    meta_path = os.path.join(_INDEX_DIR, "metadatas.jsonl")
+    with open(emb_path + ".tmp", "wb") as f:
+        np.save(f, embeddings)
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        for meta in metadatas:
+            f.write(json.dumps(meta, ensure_ascii=False) + "\n")
+    os.replace(emb_path + ".tmp", emb_path)
+    os.replace(meta_path + ".tmp", meta_path)
+
+    logger.info("Exported %d embeddings to %s.", len(metadatas), _INDEX_DIR)
+
+
 def main() -> None:
     """
     Load recipes from MongoDB and index them into ChromaDB in batches.
@@ -136,6 +218,13 @@ def main() -> None:
         ).limit(limit)
     )
 
+    # Never wipe the live collection (and desync the FAISS export) for nothing
+    if not recipes:
+        logger.error("No recipes found in MongoDB (run import_csv_to_mongo.py first); index left untouched.")
+        return
+
+    rebuild_collection()
+
     total_batches = (len(recipes) + batch_size - 1) // batch_size
     logger.info("Indexing %d recipes (batch_size=%d, batches=%d).", len(recipes), batch_size, total_batches)
 
@@ -153,6 +242,11 @@ def main() -> None:
 
     logger.info("All batches processed successfully!")
 
+    # Every vector is now L2-normalized: mark it for search.py
+    collection.modify(metadata={"normalized": True})
+
+    export_index()
+
 
 if __name__ == "__main__":
     main()
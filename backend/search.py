@@ -1,9 +1,14 @@
 import os
+import json
 import logging
+import threading
+from functools import lru_cache
 from typing import List, Tuple, Dict, Any
 
 import chromadb
-from sentence_transformers import SentenceTransformer
+import numpy as np
+
+from embeddings import load_embedding_model
 
 # ---------------------------------------------------------------------
 # Logging
@@ -14,69 +19,195 @@ logger = logging.getLogger(__name__)
 # ---------------------------------------------------------------------
 # Global resources (loaded once)
 # ---------------------------------------------------------------------
-# Embedding model used to convert user queries to vectors
-_EMBEDDING_MODEL = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+# Embedding model used to convert user queries to vectors (int8 ONNX by default).
+# Loaded lazily, never at import: onnxruntime/torch start their intra-op thread pools
+# on the first inference and those pools do not survive fork(), so under gunicorn
+# --preload each worker must build its own session (see gunicorn_conf.py).
+_EMBEDDING_MODEL = None
+_MODEL_LOCK = threading.Lock()
+
+
+def _get_embedding_model():
+    """Return the embedding model, loading (and warming) it on first use in this process."""
+    global _EMBEDDING_MODEL
+    if _EMBEDDING_MODEL is None:
+        with _MODEL_LOCK:
+            if _EMBEDDING_MODEL is None:
+                # Never export here: that is a slow one-off step (python embeddings.py)
+                _EMBEDDING_MODEL = load_embedding_model(allow_export=False)
+    return _EMBEDDING_MODEL
+
+
+def warm_up() -> None:
+    """Load the embedding model now so the first request does not pay for it."""
+    _get_embedding_model()
 
-# Persistent Chroma client + collection (vector store)
+
+# Persistent Chroma client + collection (vector store), opened lazily on first query
 _CHROMA_PATH = os.getenv("CHROMA_DB_PATH", "./chroma_db")
-_CHROMA_CLIENT = chromadb.PersistentClient(path=_CHROMA_PATH)
-_COLLECTION = _CHROMA_CLIENT.get_or_create_collection(name="recipes_embeddings")
+_CHROMA_CLIENT = None
+_COLLECTION = None
+_CHROMA_LOCK = threading.Lock()
 
 
-def search_recipes(query: str, top_k: int = 3) -> Tuple[List[Dict[str, Any]], List[List[float]], List[float]]:
-    """
-    Search for the most relevant recipes given a user query.
+def _get_collection():
+    """Return the Chroma collection, opening the persistent client on first use."""
+    global _CHROMA_CLIENT, _COLLECTION
+    if _COLLECTION is None:
+        with _CHROMA_LOCK:
+            if _COLLECTION is None:
+                _CHROMA_CLIENT = chromadb.PersistentClient(path=_CHROMA_PATH)
+                # No metadata passed: it must only ever be written by preprocess.py
+                collection = _CHROMA_CLIENT.get_or_create_collection(name="recipes_embeddings")
 
-    The function:
-      1) encodes the query into an embedding vector,
-      2) queries ChromaDB for the top-k nearest recipes,
-      3) returns recipe metadata + corresponding embeddings + query embedding.
+                # Older collections hold raw embeddings: Chroma's L2 ordering then differs from cosine
+                if collection.count() and not (collection.metadata or {}).get("normalized"):
+                    logger.warning(
+                        "Collection 'recipes_embeddings' is not normalized; rebuild it with preprocess.py."
+                    )
+                _COLLECTION = collection
+    return _COLLECTION
 
-    Args:
-        query: User text query (must be non-empty).
-        top_k: Number of recipes to return (default: 3).
+
+# In-memory FAISS index over the vectors exported by preprocess.py (Chroma is the fallback).
+# Read once at process start: restart the server after re-running preprocess.py.
+_INDEX_DIR = os.getenv("FAISS_INDEX_DIR", "./faiss_index")
+
+
+def _load_faiss_index():
+    """
+    Load the exported embeddings into a FAISS IndexFlatIP (inner product on unit vectors = cosine).
 
     Returns:
-        A tuple (recipes_meta, recipes_embeddings, query_embedding) where:
-          - recipes_meta: list of recipe metadata dicts
-          - recipes_embeddings: list of embeddings for the retrieved recipes
-          - query_embedding: embedding vector for the input query
+        (index, metadatas), or (None, None) if faiss or the export is missing or inconsistent.
+    """
+    emb_path = os.path.join(_INDEX_DIR, "embeddings.npy")
+    meta_path = os.path.join(_INDEX_DIR, "metadatas.jsonl")
+    if not (os.path.exists(emb_path) and os.path.exists(meta_path)):
+        logger.info("No exported index in %s; using ChromaDB for search.", _INDEX_DIR)
+        return None, None
 
-    Raises:
-        ValueError: if query is empty or only whitespace.
+    try:
+        import faiss
+    except ImportError:
+        logger.warning("faiss not installed; using ChromaDB for search.")
+        return None, None
+
+    embeddings = np.ascontiguousarray(np.load(emb_path), dtype=np.float32)
+    with open(meta_path, "r", encoding="utf-8") as f:
+        metadatas = [json.loads(line) for line in f if line.strip()]
+
+    # Both files must describe the same rows (e.g. not an old .npy next to a new .jsonl)
+    if embeddings.ndim != 2 or len(metadatas) != embeddings.shape[0]:
+        logger.warning(
+            "Exported index in %s is inconsistent (%d metadatas, embeddings shape %s); using ChromaDB for search.",
+            _INDEX_DIR, len(metadatas), embeddings.shape,
+        )
+        return None, None
+
+    index = faiss.IndexFlatIP(embeddings.shape[1])
+    index.add(embeddings)
+    logger.info("Loaded FAISS index with %d recipes.", index.ntotal)
+    return index, metadatas
+
+
+_INDEX, _INDEX_METADATAS = _load_faiss_index()
+
+
+@lru_cache(maxsize=1024)
+def _encode_cached(key: str) -> np.ndarray:
+    """Encode a normalized query key (memoized; the returned float32 array is read-only)."""
+    embedding = _get_embedding_model().encode([key], normalize_embeddings=True)[0].astype(np.float32, copy=False)
+    embedding.setflags(write=False)
+    return embedding
+
+
+def encode_query(query: str) -> np.ndarray:
     """
-    if query is None or not str(query).strip():
-        raise ValueError("La requête ne peut pas être vide.")
+    Encode a user query into a unit-length float32 embedding vector.
 
-    # Encode query -> vector
-    query_embedding = _EMBEDDING_MODEL.encode([query])[0]
-    logger.info("Query embedding generated (dim=%s)", len(query_embedding))
+    Queries are keyed on their stripped, lowercased text (the MiniLM tokenizer is
+    uncased), so repeated queries skip the model entirely.
+    """
+    return _encode_cached(str(query).strip().lower())
+
+
+def _search_faiss(query_embedding: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
+    """Top-k lookup in the in-memory FAISS index (a single BLAS matrix-vector product)."""
+    q = query_embedding[None, :]  # already float32 (see encode_query)
+    # FAISS allocates k result slots up front (Chroma clamps n_results, FAISS does not)
+    k = min(top_k, _INDEX.ntotal)
+    if k <= 0:
+        return []
+    _scores, idx = _INDEX.search(q, k)
+    hits = [int(i) for i in idx[0] if i >= 0]
+
+    recipes_meta: List[Dict[str, Any]] = []
+    for rank, i in enumerate(hits):
+        meta = dict(_INDEX_METADATAS[i])
+        # Ensure each item has an id field (use existing if present)
+        meta["id"] = meta.get("id", f"recipe_{rank}")
+        recipes_meta.append(meta)
+
+    return recipes_meta
 
-    # Vector search in Chroma
-    results = _COLLECTION.query(
+
+def _search_chroma(query_embedding: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
+    """Top-k lookup in ChromaDB (already ordered by distance, nearest first)."""
+    results = _get_collection().query(
         query_embeddings=[query_embedding],
         n_results=top_k,
-        include=["embeddings", "metadatas", "documents"],
+        include=["metadatas"],
     )
 
     # Extract results
     recipes_meta: List[Dict[str, Any]] = []
-    recipes_embeddings: List[List[float]] = []
 
     metadatas = results.get("metadatas", [[]])[0]
-    embeddings = results.get("embeddings", [[]])[0]
 
     for idx, meta in enumerate(metadatas):
         # Ensure each item has an id field (use existing if present)
         meta["id"] = meta.get("id", f"recipe_{idx}")
         recipes_meta.append(meta)
 
-        # Collect the corresponding embedding
-        if idx < len(embeddings):
-            recipes_embeddings.append(embeddings[idx])
+    return recipes_meta
+
+
+def search_recipes(query: str, top_k: int = 3) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+    """
+    Search for the most relevant recipes given a user query.
+
+    The function:
+      1) encodes the query into an embedding vector,
+      2) looks up the top-k nearest recipes (in-memory FAISS index, or ChromaDB),
+      3) returns recipe metadata (best match first) + query embedding.
+
+    Args:
+        query: User text query (must be non-empty).
+        top_k: Number of recipes to return (default: 3).
+
+    Returns:
+        A tuple (recipes_meta, query_embedding) where:
+          - recipes_meta: list of recipe metadata dicts, ordered by decreasing similarity
+          - query_embedding: unit-length float32 embedding vector for the input query
+
+    Raises:
+        ValueError: if query is empty or only whitespace.
+    """
+    if query is None or not str(query).strip():
+        raise ValueError("La requête ne peut pas être vide.")
+
+    # Encode query -> vector
+    query_embedding = encode_query(query)
+    logger.info("Query embedding generated (dim=%s)", len(query_embedding))
+
+    if _INDEX is not None:
+        recipes_meta = _search_faiss(query_embedding, top_k)
+    else:
+        recipes_meta = _search_chroma(query_embedding, top_k)
 
-    logger.info("Retrieved %d recipe(s) from ChromaDB.", len(recipes_meta))
+    logger.info("Retrieved %d recipe(s) from %s.", len(recipes_meta), "FAISS" if _INDEX is not None else "ChromaDB")
     for r in recipes_meta:
         logger.info("Recipe hit: %s", r)
 
-    return recipes_meta, recipes_embeddings, query_embedding
+    return recipes_meta, query_embedding
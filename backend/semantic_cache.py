@@ -0,0 +1,93 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+# ---------------------------------------------------------------------
+# Logging
+# ---------------------------------------------------------------------
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------
+# Cache parameters
+# ---------------------------------------------------------------------
+_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_SIZE", "512"))
+_TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+
+# Cached query embeddings (one unit-length row per entry) + parallel list of
+# (timestamp, top_k, value) tuples. Guarded by _LOCK (Flask serves requests in threads).
+_CACHE_EMB: Optional[np.ndarray] = None
+_CACHE_ENTRIES: List[Tuple[float, int, Any]] = []
+_LOCK = threading.Lock()
+
+
+def _drop(keep: np.ndarray) -> None:
+    """Keep only the cache rows selected by the boolean mask `keep`."""
+    global _CACHE_EMB, _CACHE_ENTRIES
+    _CACHE_ENTRIES = [entry for entry, k in zip(_CACHE_ENTRIES, keep) if k]
+    _CACHE_EMB = _CACHE_EMB[keep] if _CACHE_ENTRIES else None
+
+
+def lookup(query_embedding: np.ndarray, top_k: int) -> Optional[Any]:
+    """
+    Return the cached value of a semantically equivalent query, if any.
+
+    A cached entry matches when it was stored for the same top_k, is younger
+    than the TTL and its query embedding has a cosine similarity above the
+    threshold with `query_embedding` (both vectors are unit-length).
+
+    Args:
+        query_embedding: Unit-length float32 embedding vector for the query.
+        top_k: Number of recipes requested.
+
+    Returns:
+        The cached value, or None on a miss.
+    """
+    q = np.asarray(query_embedding, dtype=np.float32)
+    now = time.monotonic()
+
+    with _LOCK:
+        if _CACHE_EMB is None:
+            return None
+
+        # Evict expired entries on read
+        fresh = np.fromiter((now - ts <= _TTL_SECONDS for ts, _, _ in _CACHE_ENTRIES), dtype=bool)
+        if not fresh.all():
+            _drop(fresh)
+            if _CACHE_EMB is None:
+                return None
+
+        scores = _CACHE_EMB @ q
+        same_k = np.fromiter((k == top_k for _, k, _ in _CACHE_ENTRIES), dtype=bool)
+        scores[~same_k] = -1.0
+
+        best = int(np.argmax(scores))
+        if scores[best] > _THRESHOLD:
+            logger.info("Semantic cache hit (score=%.3f).", scores[best])
+            return _CACHE_ENTRIES[best][2]
+
+    return None
+
+
+def store(query_embedding: np.ndarray, top_k: int, value: Any) -> None:
+    """
+    Cache `value` for the given query embedding and top_k.
+
+    The oldest entry is evicted once the cache holds its maximum number of entries.
+    """
+    global _CACHE_EMB
+    q = np.asarray(query_embedding, dtype=np.float32)[None, :]
+
+    with _LOCK:
+        if _CACHE_EMB is not None and len(_CACHE_ENTRIES) >= _MAX_ENTRIES:
+            keep = np.ones(len(_CACHE_ENTRIES), dtype=bool)
+            keep[: len(_CACHE_ENTRIES) - _MAX_ENTRIES + 1] = False
+            _drop(keep)
+
+        _CACHE_EMB = q if _CACHE_EMB is None else np.vstack([_CACHE_EMB, q])
+        _CACHE_ENTRIES.append((time.monotonic(), top_k, value))
@@ -1,4 +1,5 @@
 import os
+import json
 import requests
 import streamlit as st
 from dotenv import load_dotenv
@@ -8,6 +9,7 @@ from dotenv import load_dotenv
 # ---------------------------------------------------------------------
 load_dotenv()
 BACKEND_URL = os.getenv("BACKEND_URL", "http://127.0.0.1:5000/search")
+STREAM_URL = os.getenv("BACKEND_STREAM_URL", BACKEND_URL.rstrip("/") + "/stream")
 TOP_K = 3
 
 # ---------------------------------------------------------------------
@@ -39,15 +41,42 @@ def _remove_video_links_section(text: str) -> str:
     return text.split(marker)[0].strip() if marker in text else text.strip()
 
 
-def _call_backend(query: str, top_k: int = TOP_K) -> dict:
-    """Send the search request to the backend and return parsed JSON."""
-    response = requests.post(
-        BACKEND_URL,
+def _call_backend(query: str, top_k: int = TOP_K):
+    """
+    Send the search request to the streaming backend endpoint.
+
+    Yields (event, data) tuples parsed from the text/event-stream response.
+    """
+    with requests.post(
+        STREAM_URL,
         json={"query": query, "top_k": top_k},
-        timeout=30,  # prevents the UI from hanging forever
-    )
-    response.raise_for_status()
-    return response.json()
+        stream=True,
+        timeout=30,  # prevents the UI from hanging forever (applies between chunks)
+    ) as response:
+        response.raise_for_status()
+
+        event = "message"
+        for line in response.iter_lines(decode_unicode=True):
+            if not line:
+                continue
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                yield event, json.loads(line[len("data:"):].strip())
+
+
+def _render_response(placeholder, text: str) -> None:
+    """Render the (possibly partial) AI suggestion into its placeholder."""
+    cleaned_response = _remove_video_links_section(text)
+    if cleaned_response:
+        html_content = f"""
+        <div style="text-align: justify; margin-bottom: 20px; line-height: 1.6;">
+            {cleaned_response}
+        </div>
+        """
+        placeholder.markdown(html_content, unsafe_allow_html=True)
+    else:
+        placeholder.markdown("Aucune réponse disponible.")
 
 
 # ---------------------------------------------------------------------
@@ -60,33 +89,41 @@ if st.button("Obtenir des recommandations !"):
 
     with st.spinner("Recherche de délicieuses idées..."):
         try:
-            data = _call_backend(user_input.strip(), TOP_K)
-
-            query = data.get("query", "")
-            response_text = data.get("response", "")
-            recipes = data.get("recipes", []) or []
-            videos = data.get("videos", {}) or {}
-
-            # No results
-            if not recipes:
-                st.error("Aucune recette pertinente n'a été trouvée. Essayez une autre requête.")
-                st.stop()
-
-            # -----------------------------------------------------------------
-            # AI Suggestion
-            # -----------------------------------------------------------------
-            st.markdown("### **Suggestion de l'IA :**")
-
-            cleaned_response = _remove_video_links_section(response_text)
-            if cleaned_response:
-                html_content = f"""
-                <div style="text-align: justify; margin-bottom: 20px; line-height: 1.6;">
-                    {cleaned_response}
-                </div>
-                """
-                st.markdown(html_content, unsafe_allow_html=True)
-            else:
-                st.markdown("Aucune réponse disponible.")
+            stream = _call_backend(user_input.strip(), TOP_K)
+
+            # Close the streamed connection even on st.stop() / early break
+            try:
+                # First event carries the recipes, the answer follows chunk by chunk
+                _event, data = next(stream, ("done", {}))
+                query = data.get("query", "")
+                recipes = data.get("recipes", []) or []
+                videos = data.get("videos", {}) or {}
+
+                # No results
+                if not recipes:
+                    st.error("Aucune recette pertinente n'a été trouvée. Essayez une autre requête.")
+                    st.stop()
+
+                # -----------------------------------------------------------------
+                # AI Suggestion (rendered progressively)
+                # -----------------------------------------------------------------
+                st.markdown("### **Suggestion de l'IA :**")
+                placeholder = st.empty()
+
+                response_text = ""
+                for event, payload in stream:
+                    if event == "chunk":
+                        response_text += payload
+                        _render_response(placeholder, response_text)
+                    elif event == "error":
+                        st.error(payload)
+                    elif event == "done":
+                        break
+            finally:
+                stream.close()
+
+            if not response_text:
+                _render_response(placeholder, response_text)
 
             # -----------------------------------------------------------------
             # Recommended recipes
@@ -94,10 +131,11 @@ if st.button("Obtenir des recommandations !"):
             st.markdown("### **Recettes recommandées :**")
 
             for recipe in recipes:
-                title = (recipe.get("title") or "Recette sans nom").capitalize()
-                ingredients = recipe.get("ingredients", "")
-                directions = recipe.get("directions", "Aucune direction disponible")
-                recipe_id = recipe.get("id", "")
+                get = recipe.get  # bound once per recipe
+                title = (get("title") or "Recette sans nom").capitalize()
+                ingredients = get("ingredients", "")
+                directions = get("directions", "Aucune direction disponible")
+                recipe_id = get("id", "")
 
                 # If ingredients arrives as a list, display as a single string
                 if isinstance(ingredients, list):